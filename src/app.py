@@ -13,9 +13,12 @@ from flask_login import (
     logout_user,
 )
 from .routes import manager, editor
+from jsonprovider import OrjsonProvider
 from musiclib import MusicCollection
 
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = "your_secret_key"  # Verander dit in productie!
 app.register_blueprint(manager, url_prefix="/manager")
 app.register_blueprint(editor, url_prefix="/editor")
@@ -1,27 +1,78 @@
+import gzip
+from collections import OrderedDict
 from pathlib import Path
+from threading import Lock
 
+import orjson
 from flask import Flask, jsonify, render_template, request
 
+from jsonprovider import OrjsonProvider
 from musiclib import MusicCollection
 
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 MUSIC_ROOT = Path("/home/mark/Music")
 DB_PATH = Path(__file__).parent.parent / "collection-data" / "music.db"
 
 collection = MusicCollection(music_root=MUSIC_ROOT, db_path=DB_PATH)
 
+# JSON bodies smaller than this are sent as-is; gzip would barely shrink them
+GZIP_MIN_SIZE = 512
+GZIP_LEVEL = 4
+
+# Longer queries are truncated; nothing in a music library needs more
+MAX_QUERY_LENGTH = 64
+
+# Serialized /search responses for recent queries, dropped when the collection changes
+SEARCH_CACHE_SIZE = 256
+_search_cache: OrderedDict[str, bytes] = OrderedDict()
+_search_cache_generation = collection.generation
+_search_cache_lock = Lock()
+
 @app.route("/")
 def index():
     return render_template("index.html")
 
 @app.route("/search")
 def search():
-    query = request.args.get("q", "").lower().strip()
-    if len(query) < 2:
+    query = request.args.get("q", "")[:MAX_QUERY_LENGTH]
+    query = "".join(ch for ch in query if ch.isprintable()).lower().strip()
+    # Queries without letters or digits match nothing in the full-text index
+    if len(query) < 2 or not any(ch.isalnum() for ch in query):
         return jsonify([])
-
-    query_lower = query.lower()
+    return app.response_class(_cached_search(query), mimetype="application/json")
+
+
+def _cached_search(query):
+    """Returns the serialized search results for a query, reusing recent responses.
+
+    Typing in the search box repeats the same queries, so the last SEARCH_CACHE_SIZE responses are kept until the music collection changes.
+    """
+    global _search_cache_generation
+    generation = collection.generation
+    with _search_cache_lock:
+        if _search_cache_generation != generation:
+            _search_cache.clear()
+            _search_cache_generation = generation
+        body = _search_cache.get(query)
+        if body is not None:
+            _search_cache.move_to_end(query)
+            return body
+
+    body = orjson.dumps(_search_results(query))
+    with _search_cache_lock:
+        if _search_cache_generation == generation:
+            _search_cache[query] = body
+            if len(_search_cache) > SEARCH_CACHE_SIZE:
+                _search_cache.popitem(last=False)
+    return body
+
+
+def _search_results(query):
+    """Builds the search results for a lowercased query."""
+    query_lower = query
 
     results = []
 
@@ -54,18 +105,11 @@ def search():
                 })
 
                 # Highlighting van track-titel
-                if query_lower in title.lower():
-                    pos = title.lower().lower().find(query_lower)
-                    before = title[:pos]
-                    match = title[pos:pos+len(query)]
-                    after = title[pos+len(query):]
-                    highlighted_tracks.append({
-                        "original": {"title": title, "duration": duration},
-                        "highlighted": f"{before}<mark>{match}</mark>{after}",
-                        "match_type": "track"
-                    })
-                    if {"type": "track", "text": f"{len(highlighted_tracks)} nummer(s)"} not in reasons:
-                        reasons.append({"type": "track", "text": f"{len(highlighted_tracks)} nummer(s)"})
+                if highlighted := _highlight_track(title, duration, query_lower):
+                    highlighted_tracks.append(highlighted)
+
+        if highlighted_tracks:
+            reasons.append({"type": "track", "text": f"{len(highlighted_tracks)} nummer(s)"})
 
         if reasons:
             results.append({
@@ -95,16 +139,8 @@ def search():
             duration = track.get("duration", "?:??")
             displayed_tracks.append({"title": title, "duration": duration})
 
-            if query_lower in title.lower():
-                pos = title.lower().find(query_lower)
-                before = title[:pos]
-                match = title[pos:pos + len(query)]
-                after = title[pos + len(query):]
-                highlighted_tracks.append({
-                    "original": {"title": title, "duration": duration},
-                    "highlighted": f"{before}<mark>{match}</mark>{after}",
-                    "match_type": "track"
-                })
+            if highlighted := _highlight_track(title, duration, query_lower):
+                highlighted_tracks.append(highlighted)
 
         if highlighted_tracks:
             reasons.append({"type": "track", "text": f"{len(highlighted_tracks)} nummer(s)"})
@@ -123,23 +159,61 @@ def search():
         album = track_entry["album"]
         title = track_entry["track"]
 
-        reasons = [{"type": "track", "text": title}]
+        # De substring-zoektocht kan ook op artiest of album matchen
+        match = track_entry.get("match", "track")
+        reasons = [{"type": match, "text": {"artist": artist, "album": album}.get(match, title)}]
 
         # We maken een enkele track tonen
         duration = track_entry.get("duration", "?:??")
+        highlighted = _highlight_track(title, duration, query_lower)
         results.append({
             "artist": artist,
             "album": album,
             "reasons": reasons,
             "tracks": [{"title": title, "duration": duration}],
-            "highlighted_tracks": [{
-                "original": {"title": title, "duration": duration},
-                "highlighted": title.lower().replace(query_lower, f"<mark>{query}</mark>"),
-                "match_type": "track"
-            }]
+            "highlighted_tracks": [highlighted] if highlighted else None
         })
 
-    return jsonify(results)
+    return results
+
+
+def _highlight_track(title, duration, query_lower):
+    """Marks the first occurrence of the query in a track title.
+
+    Returns None when the title does not contain the query, so callers can match and highlight in a single pass.
+    """
+    pos = title.lower().find(query_lower)
+    if pos < 0:
+        return None
+    end = pos + len(query_lower)
+    return {
+        "original": {"title": title, "duration": duration},
+        "highlighted": f"{title[:pos]}<mark>{title[pos:end]}</mark>{title[end:]}",
+        "match_type": "track"
+    }
+
+
+@app.after_request
+def _gzip_json(response):
+    """Compresses JSON responses for clients that accept gzip.
+
+    Search results repeat the same field names for every track, so they shrink a lot when compressed.
+    """
+    response.vary.add("Accept-Encoding")
+    if (
+        response.mimetype != "application/json"
+        or response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or "gzip" not in request.headers.get("Accept-Encoding", "").lower()
+    ):
+        return response
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+    return response
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,14 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serializes JSON responses with orjson instead of the standard library."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, default=self.default, option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
+import atexit
 import contextlib
+import json
+import os
+import random
 import sqlite3
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from threading import Event
+from threading import Condition, Event, Lock, Thread, local
+from typing import Iterator
+from weakref import WeakSet
 
 from tinytag import TinyTag
 from watchdog.events import FileSystemEventHandler
@@ -13,6 +20,37 @@ from logtools import get_logger
 
 logger = get_logger(__name__)
 
+# Applied to every new connection; WAL itself is persistent and set by _ensure_schema.
+# With WAL, synchronous=NORMAL only syncs at checkpoints and cannot corrupt the database.
+_CONNECTION_PRAGMAS = (
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+)
+
+# An upsert rather than INSERT OR REPLACE: REPLACE deletes the old row without
+# firing delete triggers, which would leave stale entries in tracks_fts.
+_INSERT_TRACK_SQL = """
+    INSERT INTO tracks
+    (path, filename, artist, album, title, albumartist, genre, year, duration, mtime)
+    VALUES (?,?,?,?,?,?,?,?,?,?)
+    ON CONFLICT(path) DO UPDATE SET
+        filename = excluded.filename,
+        artist = excluded.artist,
+        album = excluded.album,
+        title = excluded.title,
+        albumartist = excluded.albumartist,
+        genre = excluded.genre,
+        year = excluded.year,
+        duration = excluded.duration,
+        mtime = excluded.mtime
+"""
+
+
+class _Connection(sqlite3.Connection):
+    """A sqlite3 connection that can be weakly referenced, which the base class does not allow."""
+
 
 class CollectionExtractor:
     """Manages extraction and synchronization of music metadata from a file system.
@@ -20,6 +58,10 @@ class CollectionExtractor:
     Handles scanning, indexing, and monitoring of a music collection, storing metadata in a SQLite database for efficient access and updates.
     """
     SUPPORTED_EXTS = {".mp3", ".flac", ".ogg", ".oga", ".m4a", ".mp4", ".wav", ".wma"}
+    DEBOUNCE_SECONDS = 0.5
+    RETRY_SECONDS = 5.0
+    SCAN_THREADS = 8
+    TAG_THREADS = 8
 
     def __init__(self, music_root: Path, db_path: Path):
         """Initializes a CollectionExtractor for managing a music library.
@@ -37,29 +79,70 @@ class CollectionExtractor:
         self._stop_event = Event()
         self._observer: Observer | None = None
 
+        # Paths touched by filesystem events, with the time of their latest event
+        self._pending: dict[Path, float] = {}
+        self._pending_cv = Condition()
+        self._indexer: Thread | None = None
+
+        # One connection per thread, reused for every query that thread runs. They are also
+        # tracked here so close_connections can close them from any thread; the set holds them
+        # weakly, so a connection is still freed when its thread ends.
+        self._local = local()
+        self._connections: WeakSet[sqlite3.Connection] = WeakSet()
+        self._connections_lock = Lock()
+
+        # Bumped after every committed change, so callers can tell when cached results are stale
+        self.generation = 0
+
         self._ensure_schema()
 
     def get_conn(self) -> sqlite3.Connection:
-        """Creates and returns a new SQLite database connection.
+        """Returns the SQLite database connection for the calling thread.
 
-        Opens a connection to the music collection database and sets the row factory for named access. Returns the connection object for use in database operations.
+        Opens a connection to the music collection database the first time a thread asks for one and sets the row factory for named access. Later calls from the same thread reuse that connection, so queries do not pay the connection setup and pragmas each time, and it is closed once the thread ends. Use it as a context manager to scope a transaction; it is not closed on exit.
 
         Returns:
             sqlite3.Connection: A connection object to the music collection database.
         """
-        conn = sqlite3.connect(self.db_path, timeout=10.0)
-        conn.row_factory = sqlite3.Row
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=10.0, check_same_thread=False, factory=_Connection
+            )
+            conn.row_factory = sqlite3.Row
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(f"PRAGMA {pragma}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.add(conn)
         return conn
 
+    def close_connections(self) -> None:
+        """Closes the database connections opened by all threads.
+
+        Threads that query the database afterwards open a new connection.
+
+        Returns:
+            None
+        """
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections = WeakSet()
+            self._local = local()
+        for conn in connections:
+            conn.close()
+
     def _ensure_schema(self) -> None:
         """Ensures the database schema for the music collection exists.
 
-        Creates the tracks table and necessary indexes if they do not already exist in the database. Adds the mtime column for sync checking if it is missing.
+        Switches the database to write-ahead logging and creates the tracks table, its full-text index, and necessary indexes if they do not already exist in the database. Adds the mtime column for sync checking if it is missing.
 
         Returns:
             None
         """
         with self.get_conn() as conn:
+            # WAL is persistent: readers no longer block the indexer and vice versa
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS tracks (
                     path TEXT PRIMARY KEY,
@@ -77,11 +160,51 @@ class CollectionExtractor:
             conn.execute("CREATE INDEX IF NOT EXISTS idx_artist ON tracks(artist COLLATE NOCASE)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_album  ON tracks(album  COLLATE NOCASE)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_title  ON tracks(title  COLLATE NOCASE)")
+            # Covers the track lookups by artist and album in search_grouped, in the order they are returned
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_artist_album_tracks
+                ON tracks(artist, album, path, title, filename, duration)
+            """)
 
             # Add mtime column if not exists (for sync checking)
             with contextlib.suppress(sqlite3.OperationalError):
                 conn.execute("ALTER TABLE tracks ADD COLUMN mtime REAL")
 
+            # Full-text index over tracks, kept in sync by triggers
+            has_fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'tracks_fts'"
+            ).fetchone()
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+                    artist, album, title,
+                    content='tracks', content_rowid='rowid',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS tracks_fts_insert AFTER INSERT ON tracks BEGIN
+                    INSERT INTO tracks_fts(rowid, artist, album, title)
+                    VALUES (new.rowid, new.artist, new.album, new.title);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS tracks_fts_delete AFTER DELETE ON tracks BEGIN
+                    INSERT INTO tracks_fts(tracks_fts, rowid, artist, album, title)
+                    VALUES ('delete', old.rowid, old.artist, old.album, old.title);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS tracks_fts_update AFTER UPDATE ON tracks BEGIN
+                    INSERT INTO tracks_fts(tracks_fts, rowid, artist, album, title)
+                    VALUES ('delete', old.rowid, old.artist, old.album, old.title);
+                    INSERT INTO tracks_fts(rowid, artist, album, title)
+                    VALUES (new.rowid, new.artist, new.album, new.title);
+                END
+            """)
+            if not has_fts:
+                # Index tracks stored before the full-text index existed
+                conn.execute("INSERT INTO tracks_fts(tracks_fts) VALUES ('rebuild')")
+
     def count_tracks(self) -> int:
         """Returns the total number of tracks in the music collection.
 
@@ -93,12 +216,25 @@ class CollectionExtractor:
         with self.get_conn() as conn:
             return conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
 
+    def has_tracks(self) -> bool:
+        """Checks whether the music collection contains any tracks.
+
+        Stops at the first track record instead of counting them all, which makes it cheap to call at startup on a large collection.
+
+        Returns:
+            bool: True if at least one track is stored in the database.
+        """
+        with self.get_conn() as conn:
+            return conn.execute("SELECT EXISTS (SELECT 1 FROM tracks)").fetchone()[0] == 1
+
     def is_synced_with_filesystem(self, sample_size: int = 200) -> bool:
         """Checks if the database is in sync with the file system.
 
         Randomly samples tracks from the database and verifies that each file exists and its modification time matches the stored value.
         Returns True if all sampled files are in sync, otherwise False.
 
+        Samples are picked by random rowid, which looks up each track directly instead of sorting the whole table. Rowids of deleted tracks leave gaps, so fewer tracks than requested may be checked.
+
         Args:
             sample_size (int): The number of tracks to sample for sync checking.
 
@@ -106,13 +242,17 @@ class CollectionExtractor:
             bool: True if the sampled files are in sync with the database, False otherwise.
         """
         with self.get_conn() as conn:
-            rows = conn.execute("SELECT path, mtime FROM tracks ORDER BY RANDOM() LIMIT ?", (sample_size,)).fetchall()
-            for row in rows:
-                path = Path(row["path"])
-                if not path.exists():
-                    return False
-                if row["mtime"] is None or path.stat().st_mtime != row["mtime"]:
-                    return False
+            max_rowid = conn.execute("SELECT max(rowid) FROM tracks").fetchone()[0]
+            if max_rowid is None:
+                return True
+            rowids = random.sample(range(1, max_rowid + 1), min(sample_size, max_rowid))
+            rows = conn.execute(
+                "SELECT path, mtime FROM tracks WHERE rowid IN (SELECT value FROM json_each(?))",
+                (json.dumps(rowids),),
+            ).fetchall()
+        for row in rows:
+            if row["mtime"] is None or self._file_mtime(row["path"]) != row["mtime"]:
+                return False
         return True
 
     def resync(self):
@@ -129,101 +269,171 @@ class CollectionExtractor:
         with self.get_conn() as conn:
             db_paths = {row["path"] for row in conn.execute("SELECT path FROM tracks")}
 
-        fs_paths = {
-            str(p) for p in self.music_root.rglob("*")
-            if p.is_file() and p.suffix.lower() in self.SUPPORTED_EXTS
-        }
+        fs_paths = set(self._iter_music_files())
 
         to_add = fs_paths - db_paths
         to_remove = db_paths - fs_paths
 
+        rows = []
+        if to_add:
+            # Threads rather than processes: the collection runs the observer and indexer threads
+            # by now, and forking a multi-threaded process can deadlock the children
+            with ThreadPoolExecutor(max_workers=self.TAG_THREADS) as pool:
+                rows = [row for row in pool.map(_read_track, to_add) if row is not None]
+
         with self.get_conn() as conn:
             if to_remove:
                 conn.executemany("DELETE FROM tracks WHERE path = ?", [(p,) for p in to_remove])
-            for path_str in to_add:
-                try:
-                    self._index_file(conn, Path(path_str))
-                except Exception as e:
-                    logger.warning(f"Failed to index {path_str}: {e}")
+            conn.executemany(_INSERT_TRACK_SQL, rows)
             conn.commit()
+            self.generation += 1
 
         added = len(to_add)
         removed = len(to_remove)
         logger.info(f"Sync complete: +{added:,} / -{removed:,} tracks ({time.time() - start:.1f}s)")
 
-    def rebuild(self) -> None:
+    def rebuild(self, force: bool = False) -> None:
         """Scans and reindexes the entire music collection.
 
-        Removes all existing track records and rebuilds the index from the music root directory. Prints progress and summary information to the console.
+        Reads the tags of every file whose modification time differs from the one stored in the database and removes the records of files that no longer exist. Unchanged files are skipped unless a forced rebuild is requested, which removes all existing track records first. Prints progress and summary information to the console.
+
+        Args:
+            force: Re-read the tags of every file, even if it did not change.
 
         Returns:
             None
         """
-        logger.info("Full rebuild started...")
+        logger.info("Full rebuild started..." if force else "Rebuild started...")
         start = time.time()
+        paths = list(self._iter_music_files())
+        known = {}
+        if not force:
+            with self.get_conn() as conn:
+                known = dict(conn.execute("SELECT path, mtime FROM tracks").fetchall())
+        to_read = [p for p in paths if known.get(p) is None or known[p] != self._file_mtime(p)]
+
+        # All tags are read before the write transaction starts, so the database is not locked
+        # while parsing. Threads as in resync: forking next to the monitoring threads is unsafe.
+        rows = []
+        with ThreadPoolExecutor(max_workers=self.TAG_THREADS) as pool:
+            for row in pool.map(_read_track, to_read):
+                if row is None:
+                    continue
+                rows.append(row)
+                if len(rows) % 5000 == 0:
+                    logger.info(f"Read {len(rows):,} tracks...")
+
         with self.get_conn() as conn:
-            conn.execute("DELETE FROM tracks")
-            count = 0
-            for fp in self.music_root.rglob("*"):
-                if fp.is_file() and fp.suffix.lower() in self.SUPPORTED_EXTS:
-                    try:
-                        self._index_file(conn, fp)
-                        count += 1
-                    except Exception as e:
-                        logger.warning(f"Skip {fp}: {e}")
-                    if count % 5000 == 0:
-                        logger.info(f"Indexed {count:,} tracks...")
+            if force:
+                conn.execute("DELETE FROM tracks")
+            else:
+                removed = known.keys() - set(paths)
+                conn.executemany("DELETE FROM tracks WHERE path = ?", [(p,) for p in removed])
+            conn.executemany(_INSERT_TRACK_SQL, rows)
             conn.commit()
-        logger.info(f"Full rebuild complete: {count:,} tracks in {time.time() - start:.1f}s")
+            self.generation += 1
+        count = len(rows)
+        logger.info(
+            f"Rebuild complete: {count:,} tracks indexed, {len(paths) - len(to_read):,} unchanged "
+            f"in {time.time() - start:.1f}s"
+        )
+
+    @staticmethod
+    def _file_mtime(path: str) -> float | None:
+        """Returns the modification time of a file, or None if it cannot be read."""
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
 
-    def _index_file(self, conn: sqlite3.Connection, path: Path) -> None:
-        """Indexes a single music file and updates the database with its metadata.
+    def _iter_music_files(self) -> Iterator[str]:
+        """Yields the paths of all supported music files below the music root.
 
-        Extracts metadata from the given file and inserts or updates the corresponding record in the tracks table. If metadata extraction fails, the file is skipped.
+        Walks the directory tree with os.scandir, which reuses the file type information returned by the directory listing instead of issuing a stat call per entry. The directories directly below the root, usually one per artist, are walked in SCAN_THREADS parallel threads, so the time spent waiting on directory listings overlaps on network shares and slow disks. Directories that cannot be read are skipped.
+
+        Returns:
+            Iterator[str]: The paths of the supported music files.
+        """
+        subdirs = []
+        try:
+            with os.scandir(self.music_root) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif self._is_music_file(entry):
+                        yield entry.path
+        except OSError as e:
+            logger.warning(f"Cannot scan {e.filename}: {e.strerror}")
+
+        with ThreadPoolExecutor(max_workers=self.SCAN_THREADS) as pool:
+            for paths in pool.map(self._walk_music_dir, subdirs):
+                yield from paths
+
+    def _walk_music_dir(self, top: str) -> list[str]:
+        """Collects the paths of all supported music files below a directory.
 
         Args:
-            conn: The SQLite database connection.
-            path: The path to the music file to index.
+            top: The directory to walk.
 
         Returns:
-            None
+            list[str]: The paths of the supported music files.
+        """
+        paths = []
+        stack = [top]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif self._is_music_file(entry):
+                            paths.append(entry.path)
+            except OSError as e:
+                logger.warning(f"Cannot scan {e.filename}: {e.strerror}")
+        return paths
+
+    def _is_music_file(self, entry: os.DirEntry) -> bool:
+        """Checks whether a directory entry is a file with a supported extension."""
+        name = entry.name
+        return name[name.rfind("."):].lower() in self.SUPPORTED_EXTS and entry.is_file()
+
+    @staticmethod
+    def _track_row(path: str) -> tuple:
+        """Extracts the metadata of a single music file as a tracks table row.
+
+        Reads the file's tags and falls back to values derived from the path for missing artist, album, or title information. The path is handled as a plain string, as this runs for every file in the collection.
+
+        Args:
+            path: The path to the music file.
+
+        Returns:
+            tuple: The column values in the order of the tracks table insert.
         """
         tag = None
         try:
-            tag = TinyTag.get(path, tags=True, duration=True)
+            tag = TinyTag.get(path, tags=True, duration=True, image=False)
         except Exception as e:
             logger.warning(
                 f"Failed to extract tags from {path}: {type(e).__name__}: {e}",
                 exc_info=True
             )
 
-        artist = self._extract_artist(tag, path)
-        album = self._extract_album(tag, path)
-        title = self._extract_title(tag, path)
-        year = self._safe_int_year(getattr(tag, "year", None))
-        duration = getattr(tag, "duration", None)
-        albumartist = getattr(tag, "albumartist", None)
-        genre = getattr(tag, "genre", None)
-        mtime = path.stat().st_mtime
-
-        conn.execute("""
-            INSERT OR REPLACE INTO tracks
-            (path, filename, artist, album, title, albumartist, genre, year, duration, mtime)
-            VALUES (?,?,?,?,?,?,?,?,?,?)
-        """, (
-            str(path),
-            path.name,
-            artist,
-            album,
-            title,
-            albumartist,
-            genre,
-            year,
-            duration,
-            mtime,
-        ))
-
-    def _safe_int_year(self, value):
+        parts = path.split(os.sep)
+        return (
+            path,
+            parts[-1],
+            CollectionExtractor._extract_artist(tag, parts),
+            CollectionExtractor._extract_album(tag, parts),
+            CollectionExtractor._extract_title(tag, parts),
+            getattr(tag, "albumartist", None),
+            getattr(tag, "genre", None),
+            CollectionExtractor._safe_int_year(getattr(tag, "year", None)),
+            getattr(tag, "duration", None),
+            os.stat(path).st_mtime,
+        )
+
+    @staticmethod
+    def _safe_int_year(value):
         """Converts a value to an integer year if possible.
 
         Attempts to extract and return a valid integer year from the input value. Returns None if the value cannot be interpreted as a year.
@@ -241,46 +451,55 @@ class CollectionExtractor:
         except ValueError:
             return None
 
-    def _extract_artist(self, tag, path: Path) -> str:
+    @staticmethod
+    def _extract_artist(tag, parts: list[str]) -> str:
         """Extracts the artist name from tag or path.
 
         Returns the artist name as a string, using tag metadata or directory names as fallback. If no artist is found, returns 'Unknown'.
 
         Args:
             tag: The metadata tag object from TinyTag.
-            path: The path to the music file.
+            parts: The components of the path to the music file.
 
         Returns:
             str: The extracted artist name.
         """
         artist = getattr(tag, "artist", None) or getattr(tag, "albumartist", None)
-        if not artist and len(path.parents) >= 3:
-            artist = path.parent.parent.name
+        if not artist and len(parts) >= 4:
+            artist = parts[-3]
         return (artist or "Unknown").strip()
 
-    def _extract_album(self, tag, path: Path) -> str:
+    @staticmethod
+    def _extract_album(tag, parts: list[str]) -> str:
         album = getattr(tag, "album", None)
         if not album:
-            album = path.parent.name
-            if album in {"", ".", "..", "Music", "music"} and len(path.parents) >= 3:
-                album = path.parent.parent.name
+            album = parts[-2] if len(parts) >= 2 else ""
+            if album in {"", ".", "..", "Music", "music"} and len(parts) >= 4:
+                album = parts[-3]
         return (album or "Unknown").strip()
 
-    def _extract_title(self, tag, path: Path) -> str:
-        return (getattr(tag, "title", None) or path.stem or "Unknown").strip()
+    @staticmethod
+    def _extract_title(tag, parts: list[str]) -> str:
+        stem = parts[-1].rpartition(".")[0] or parts[-1]
+        return (getattr(tag, "title", None) or stem or "Unknown").strip()
 
     # ==================== Monitoring ====================
 
     def start_monitoring(self):
         """Starts live monitoring of the music directory for file system changes.
 
-        Sets up a file system observer to watch for changes in the music collection and updates the database in real time.
+        Sets up a file system observer to watch for changes in the music collection and updates the database in real time. Monitoring is stopped at interpreter exit, so queued updates are written before the process ends.
 
         Returns:
             None
         """
         if self._observer is not None:
             return
+        atexit.register(self.stop_monitoring)
+
+        self._stop_event.clear()
+        self._indexer = Thread(target=self._process_pending, name="musiclib-indexer", daemon=True)
+        self._indexer.start()
 
         self._observer = Observer()
         self._observer.schedule(Watcher(self), str(self.music_root), recursive=True)
@@ -296,11 +515,140 @@ class CollectionExtractor:
             None
         """
         if self._observer is not None:
+            atexit.unregister(self.stop_monitoring)
             self._observer.stop()
             self._observer.join()
             self._observer = None
+
+            self._stop_event.set()
+            with self._pending_cv:
+                self._pending_cv.notify()
+            self._indexer.join()
+            self._indexer = None
             logger.info("Filesystem monitoring stopped")
 
+    def queue_update(self, path: Path) -> None:
+        """Schedules a file for re-indexing by the background indexer.
+
+        Events for the same file that arrive in quick succession, such as the many modifications while a file is being copied, are coalesced into a single update. The file is updated once no event has arrived for it for DEBOUNCE_SECONDS.
+
+        Args:
+            path: The path of the created, modified, moved, or deleted file.
+
+        Returns:
+            None
+        """
+        with self._pending_cv:
+            if not self._pending:
+                self._pending_cv.notify()
+            self._pending[path] = time.monotonic()
+
+    def _process_pending(self) -> None:
+        """Re-indexes queued files until monitoring is stopped.
+
+        Waits until queued paths have had no events for DEBOUNCE_SECONDS and updates those files in one transaction, while paths that are still changing stay queued. A batch that fails is logged and queued again, so one database error does not stop the indexer. Everything still queued is updated when monitoring stops. Runs on the background indexer thread.
+
+        Returns:
+            None
+        """
+        while True:
+            with self._pending_cv:
+                while not self._pending and not self._stop_event.is_set():
+                    self._pending_cv.wait()
+                if self._stop_event.is_set():
+                    batch = set(self._pending)
+                    self._pending.clear()
+                else:
+                    cutoff = time.monotonic() - self.DEBOUNCE_SECONDS
+                    batch = {path for path, last_event in self._pending.items() if last_event <= cutoff}
+                    if not batch:
+                        # Sleep until the quiet period of the oldest path is over
+                        self._pending_cv.wait(min(self._pending.values()) - cutoff)
+                        continue
+                    for path in batch:
+                        del self._pending[path]
+            try:
+                self._update_files(batch)
+            except Exception as e:
+                logger.error(f"Error updating {len(batch):,} files: {e}", exc_info=True)
+                if not self._stop_event.is_set():
+                    self._requeue(batch)
+            if self._stop_event.is_set():
+                return
+
+    def _requeue(self, paths: set[Path]) -> None:
+        """Queues files again after their update failed, for instance because the database was locked.
+
+        The files are retried after RETRY_SECONDS, unless a newer event for a file arrives first.
+
+        Args:
+            paths: The paths of the files whose update failed.
+
+        Returns:
+            None
+        """
+        retry_at = time.monotonic() + self.RETRY_SECONDS - self.DEBOUNCE_SECONDS
+        with self._pending_cv:
+            for path in paths:
+                self._pending[path] = max(self._pending.get(path, retry_at), retry_at)
+
+    def _update_files(self, paths: set[Path]) -> None:
+        """Brings the database records of a batch of files in line with the filesystem.
+
+        Reads the tags of the files that exist and removes the records of those that do not, then writes all changes in a single transaction. Files whose modification time matches the one in the database, such as files that were only opened or had their permissions changed, are skipped without reading their tags.
+
+        Args:
+            paths: The paths of the files to update.
+
+        Returns:
+            None
+        """
+        with self.get_conn() as conn:
+            known = dict(
+                conn.execute(
+                    "SELECT path, mtime FROM tracks WHERE path IN (SELECT value FROM json_each(?))",
+                    (json.dumps([str(p) for p in paths]),),
+                ).fetchall()
+            )
+        rows = []
+        removed = []
+        for path in paths:
+            path_str = str(path)
+            mtime = self._file_mtime(path_str)
+            if mtime is None:
+                if path_str in known:
+                    removed.append((path_str,))
+            elif known.get(path_str) != mtime:
+                try:
+                    rows.append(self._track_row(path_str))
+                except Exception as e:
+                    logger.error(f"Error indexing file {path}: {e}", exc_info=True)
+        if not rows and not removed:
+            return
+        with self.get_conn() as conn:
+            conn.executemany("DELETE FROM tracks WHERE path = ?", removed)
+            conn.executemany(_INSERT_TRACK_SQL, rows)
+            conn.commit()
+            self.generation += 1
+
+def _read_track(path_str: str) -> tuple | None:
+    """Extracts the tracks table row for a music file in a worker thread.
+
+    Wraps CollectionExtractor._track_row so a single unreadable file does not abort a parallel rebuild or resync.
+
+    Args:
+        path_str: The path to the music file.
+
+    Returns:
+        tuple or None: The row to insert, or None if the file could not be indexed.
+    """
+    try:
+        return CollectionExtractor._track_row(path_str)
+    except Exception as e:
+        logger.warning(f"Skip {path_str}: {e}")
+        return None
+
+
 class Watcher(FileSystemEventHandler):
     """Handles file system events for the music collection and updates the database.
 
@@ -319,7 +667,7 @@ class Watcher(FileSystemEventHandler):
     def on_any_event(self, event):
         """Handles any file system event for the music collection.
 
-        Responds to file creation, modification, movement, or deletion events by updating the music database accordingly. Skips directories and unsupported file types.
+        Queues created, modified, moved, or deleted files for re-indexing by the extractor. For moves, both the old and the new location are queued. Skips directories, unsupported file types, and events that do not change a file.
 
         Args:
             event: The file system event to handle.
@@ -327,18 +675,11 @@ class Watcher(FileSystemEventHandler):
         Returns:
             None
         """
-        if event.is_directory:
-            return
-        path = Path(event.src_path if hasattr(event, "src_path") else event.dest_path)
-        if path.suffix.lower() not in self.extractor.SUPPORTED_EXTS:
+        if event.is_directory or event.event_type in ("opened", "closed_no_write"):
             return
-
-        with self.extractor.get_conn() as conn:
-            if event.event_type in ("deleted", "moved") and hasattr(event, "src_path"):
-                conn.execute("DELETE FROM tracks WHERE path = ?", (event.src_path,))
-            elif path.exists():
-                try:
-                    self._index_file(conn, path)
-                except Exception as e:
-                    logger.error(f"Error indexing file {path}: {e}", exc_info=True)
-            conn.commit()
\ No newline at end of file
+        for path_str in (event.src_path, getattr(event, "dest_path", "")):
+            if not path_str:
+                continue
+            path = Path(path_str)
+            if path.suffix.lower() in self.extractor.SUPPORTED_EXTS:
+                self.extractor.queue_update(path)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
 from sqlite3 import Connection
 from typing import Iterator, Dict, Any
@@ -7,6 +8,14 @@ from typing import Iterator, Dict, Any
 from ._extractor import CollectionExtractor  # internal implementation
 
 
+def _fts_prefix_phrase(query: str) -> str:
+    """Quotes a search query as an FTS5 phrase whose last word may be a prefix.
+
+    Double quotes inside the query are escaped, so user input cannot inject FTS5 query syntax.
+    """
+    return '"' + query.replace('"', '""') + '"*'
+
+
 class MusicCollection:
     """
     High-level interface to a music library.
@@ -41,8 +50,7 @@ class MusicCollection:
             db_path=Path(db_path) if db_path else None,
         )
 
-        track_count = self._extractor.count_tracks()
-        if track_count == 0:
+        if not self._extractor.has_tracks():
             # Brand new database — force full indexing
             print("No tracks in database — performing initial scan...")
             self._extractor.rebuild()
@@ -59,6 +67,11 @@ class MusicCollection:
 
     # ====================== Query API ======================
 
+    @property
+    def generation(self) -> int:
+        """Return a counter that changes whenever the indexed tracks change."""
+        return self._extractor.generation
+
     def count(self) -> int:
         """Return total number of tracks."""
         return self._extractor.count_tracks()
@@ -73,7 +86,7 @@ class MusicCollection:
     ) -> Iterator[dict[str, Any]]:
         """Searches for tracks matching the given criteria.
 
-        Returns an iterator of track metadata dictionaries that match the specified artist, album, title, genre, and year filters.
+        Returns an iterator of track metadata dictionaries that match the specified artist, album, title, genre, and year filters. The artist, album, and title filters are matched against the full-text index, so they match words starting with the given text.
 
         Args:
             artist: Optional artist name to filter tracks.
@@ -85,26 +98,29 @@ class MusicCollection:
         Returns:
             Iterator[dict]: An iterator of track metadata dictionaries matching the criteria.
         """
-        query = "SELECT * FROM tracks WHERE 1=1"
+        terms = [
+            f"{column} : {_fts_prefix_phrase(value)}"
+            for column, value in (("artist", artist), ("album", album), ("title", title))
+            if value
+        ]
         params: list[Any] = []
+        if terms:
+            query = (
+                "SELECT t.* FROM tracks_fts JOIN tracks t ON t.rowid = tracks_fts.rowid"
+                " WHERE tracks_fts MATCH ?"
+            )
+            params.append(" AND ".join(terms))
+        else:
+            query = "SELECT t.* FROM tracks t WHERE 1=1"
 
-        if artist:
-            query += " AND artist LIKE ?"
-            params.append(f"%{artist}%")
-        if album:
-            query += " AND album LIKE ?"
-            params.append(f"%{album}%")
-        if title:
-            query += " AND title LIKE ?"
-            params.append(f"%{title}%")
         if genre:
-            query += " AND genre LIKE ?"
+            query += " AND t.genre LIKE ?"
             params.append(f"%{genre}%")
         if year:
-            query += " AND year = ?"
+            query += " AND t.year = ?"
             params.append(year)
 
-        query += " ORDER BY artist COLLATE NOCASE, year, album, title"
+        query += " ORDER BY t.artist COLLATE NOCASE, t.year, t.album, t.title"
 
         with self._extractor.get_conn() as conn:
             for row in conn.execute(query, params):
@@ -154,32 +170,36 @@ class MusicCollection:
         if not (q := query.strip()):
             return {"artists": [], "albums": [], "tracks": []}
 
-        like_pat = f"%{q}%"
+        phrase = _fts_prefix_phrase(q)
         starts_pat = f"{q}%"
 
         with self._extractor.get_conn() as conn:
             result = {
                 "albums": [],
                 "tracks": [],
-                "artists": self._search_artists(conn, starts_pat, limit),
+                "artists": self._search_artists(conn, phrase, starts_pat, limit),
             }
             result["albums"] = self._search_albums(
-                conn, like_pat, starts_pat, limit, result["artists"]
+                conn, phrase, starts_pat, limit, result["artists"]
             )
             result["tracks"] = self._search_tracks(
-                conn, like_pat, starts_pat, limit, result["artists"], result["albums"]
+                conn, phrase, starts_pat, limit, result["artists"], result["albums"]
             )
+            if not any(result.values()):
+                # Nothing starts with the query; fall back to the slower substring scan
+                result["tracks"] = self._search_tracks_substring(conn, q, limit)
         return result
 
     def _search_artists(
-        self, conn: Connection, starts_pat: str, limit: int
+        self, conn: Connection, phrase: str, starts_pat: str, limit: int
     ) -> list[dict[str, Any]]:
-        """Searches for artists whose names match the given pattern.
+        """Searches for artists whose names match the given phrase.
 
-        Returns a list of artist dictionaries matching the search criteria. The search is case-insensitive and limited to the specified number of results.
+        Returns a list of artist dictionaries matching the search criteria, with names that start with the query listed first. The search is case-insensitive and limited to the specified number of results.
 
         Args:
             conn: The SQLite database connection.
+            phrase: The full-text prefix phrase to match artist names.
             starts_pat: The pattern to match artist names that start with the query.
             limit: The maximum number of results to return.
 
@@ -189,85 +209,98 @@ class MusicCollection:
 
         cur = conn.execute(
             """
-            SELECT DISTINCT artist FROM tracks
-            WHERE artist LIKE ? COLLATE NOCASE
-            ORDER BY artist LIKE ? DESC, artist COLLATE NOCASE
+            SELECT DISTINCT t.artist FROM tracks_fts
+            JOIN tracks t ON t.rowid = tracks_fts.rowid
+            WHERE tracks_fts MATCH ?
+            ORDER BY t.artist LIKE ? DESC, t.artist COLLATE NOCASE
             LIMIT ?
         """,
-            (starts_pat, starts_pat, limit),
+            (f"artist : {phrase}", starts_pat, limit),
         )
         artists = [{"artist": r["artist"]} for r in cur]
+        albums_by_artist = self._search_artists_albums(
+            conn=conn, artists=[a["artist"] for a in artists]
+        )
         for artist in artists:
-            artist.update(
-                {
-                    "albums": self._search_artist_albums(
-                        conn=conn, artist=artist["artist"]
-                    )
-                }
-            )
+            artist["albums"] = albums_by_artist.get(artist["artist"], [])
         return artists
 
-    def _search_artist_albums(self, conn: Connection, artist: str):
-        """Searches for albums by a specific artist.
+    def _search_artists_albums(
+        self, conn: Connection, artists: list[str]
+    ) -> dict[str, list[dict]]:
+        """Retrieves the albums and their tracks for a set of artists in one query.
 
-        Returns a list of album dictionaries for the given artist, each including its tracks. The search is case-insensitive and results are ordered by album name.
+        Returns the albums of each artist, ordered by album name, with each album including its tracks. Fetching all artists at once avoids a separate query per artist and per album.
 
         Args:
             conn: The SQLite database connection.
-            artist: The artist name to search for.
+            artists: The artist names to retrieve albums for.
 
         Returns:
-            list[dict]: A list of dictionaries, each containing an album name and its tracks.
+            dict[str, list[dict]]: Album dictionaries with their tracks, keyed by artist name.
         """
+        if not artists:
+            return {}
         sql = """
-                SELECT DISTINCT artist, album FROM tracks
-                WHERE artist = ?
-                ORDER BY album
-            """
-        cur = conn.execute(sql, (artist,))
-        albums = [{"album": r["album"]} for r in cur]
-        for album in albums:
-            album.update(
+            SELECT artist, album, title AS track, path, filename, duration
+            FROM tracks
+            WHERE artist IN (SELECT value FROM json_each(?))
+            ORDER BY artist, album, path
+        """
+        result: dict[str, list[dict]] = {}
+        albums_by_key: dict[tuple[str, str], dict] = {}
+        for r in conn.execute(sql, (json.dumps(artists),)):
+            key = (r["artist"], r["album"])
+            album = albums_by_key.get(key)
+            if album is None:
+                album = albums_by_key[key] = {"album": r["album"], "tracks": []}
+                result.setdefault(r["artist"], []).append(album)
+            album["tracks"].append(
                 {
-                    "tracks": self._search_album_tracks(
-                        conn=conn, artist=artist, album=album["album"]
-                    )
+                    "track": r["track"],
+                    "filename": r["filename"],
+                    "path": r["path"],
+                    "duration": self._format_duration(r["duration"]),
                 }
             )
-        return albums
+        return result
 
-    def _search_album_tracks(
-        self, conn: Connection, artist: str, album: str
-    ) -> list[dict]:
-        """Searches for tracks in a specific album by a specific artist.
+    def _search_albums_tracks(
+        self, conn: Connection, albums: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], list[dict]]:
+        """Retrieves the tracks of a set of albums in one query.
 
-        Returns a list of track dictionaries for the given artist and album, including track title, filename, and path.
+        Returns the tracks of each album, including track title, filename, path, and duration. Fetching all albums at once avoids a separate query per album.
 
         Args:
             conn: The SQLite database connection.
-            artist: The artist name to search for.
-            album: The album name to search for.
+            albums: The (artist, album) pairs to retrieve tracks for.
 
         Returns:
-            list[dict]: A list of dictionaries, each containing track title, filename, and path.
+            dict[tuple[str, str], list[dict]]: Track dictionaries keyed by (artist, album).
         """
+        if not albums:
+            return {}
         sql = """
-            SELECT DISTINCT title as track, path, filename, duration
+            SELECT artist, album, title AS track, path, filename, duration
             FROM tracks
-            WHERE artist = ? AND album = ?
-            ORDER BY album;
-            """
-        cur = conn.execute(sql, (artist, album))
-        tracks = [
-            {
-                "track": r["track"],
-                "filename": r["filename"],
-                "path": r["path"],
-                "duration": self._format_duration(r["duration"]),
-            }
-            for r in cur
-        ]
-        return tracks
+            WHERE (artist, album) IN (
+                SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]')
+                FROM json_each(?)
+            )
+            ORDER BY artist, album, path
+        """
+        result: dict[tuple[str, str], list[dict]] = {}
+        for r in conn.execute(sql, (json.dumps(albums),)):
+            result.setdefault((r["artist"], r["album"]), []).append(
+                {
+                    "track": r["track"],
+                    "filename": r["filename"],
+                    "path": r["path"],
+                    "duration": self._format_duration(r["duration"]),
+                }
+            )
+        return result
 
     def _format_duration(self, seconds: float | None) -> str:
         if not seconds:
@@ -279,18 +312,18 @@ class MusicCollection:
     def _search_albums(
         self,
         conn: Connection,
-        like_pat: str,
+        phrase: str,
         starts_pat: str,
         limit: int,
         artists: list[dict[str, Any]],
     ) -> list[dict[str, Any]]:
-        """Searches for albums whose names match the given pattern.
+        """Searches for albums whose names match the given phrase.
 
         Returns a list of album dictionaries matching the search criteria, excluding artists already found in previous searches. The search is case-insensitive and limited to the specified number of results.
 
         Args:
             conn: The SQLite database connection.
-            like_pat: The pattern to match album names.
+            phrase: The full-text prefix phrase to match album names.
             starts_pat: The pattern to match album names that start with the query.
             limit: The maximum number of results to return.
             artists: A list of artist dictionaries to exclude from the search.
@@ -298,52 +331,41 @@ class MusicCollection:
         Returns:
             List[dict]: A list of dictionaries, each containing artist and album name.
         """
-        if skip := {a["artist"].lower() for a in artists}:
-            placeholders = ",".join("?" for _ in skip)
-            sql = f"""
-                SELECT DISTINCT artist, album FROM tracks
-                WHERE album LIKE ? COLLATE NOCASE
-                    AND lower(artist) NOT IN ({placeholders})
-                ORDER BY album LIKE ? DESC, album COLLATE NOCASE
-                LIMIT ?
-            """
-            params = (like_pat, starts_pat, *skip, limit)
-        else:
-            sql = """
-                SELECT DISTINCT artist, album FROM tracks
-                WHERE album LIKE ? COLLATE NOCASE
-                ORDER BY album LIKE ? DESC, album COLLATE NOCASE
-                LIMIT ?
-            """
-            params = (like_pat, starts_pat, limit)
+        skip = {a["artist"] for a in artists}
+        sql = """
+            SELECT DISTINCT t.artist, t.album FROM tracks_fts
+            JOIN tracks t ON t.rowid = tracks_fts.rowid
+            WHERE tracks_fts MATCH ?
+                AND t.artist COLLATE NOCASE NOT IN (SELECT value FROM json_each(?))
+            ORDER BY t.album LIKE ? DESC, t.album COLLATE NOCASE
+            LIMIT ?
+        """
+        params = (f"album : {phrase}", json.dumps(list(skip)), starts_pat, limit)
         cur = conn.execute(sql, params)
         albums = [{"artist": r["artist"], "album": r["album"]} for r in cur]
+        tracks = self._search_albums_tracks(
+            conn=conn, albums=[(a["artist"], a["album"]) for a in albums]
+        )
         for album in albums:
-            album.update(
-                {
-                    "tracks": self._search_album_tracks(
-                        conn=conn, artist=album["artist"], album=album["album"]
-                    )
-                }
-            )
+            album["tracks"] = tracks.get((album["artist"], album["album"]), [])
         return albums
 
     def _search_tracks(
         self,
         conn: Connection,
-        like_pat: str,
+        phrase: str,
         starts_pat: str,
         limit: int,
         artists: list[dict[str, Any]],
         albums: list[dict[str, Any]],
     ) -> list[dict[str, Any]]:
-        """Searches for tracks whose titles match the given pattern.
+        """Searches for tracks whose titles match the given phrase.
 
         Returns a list of track dictionaries matching the search criteria, excluding artists already found in previous searches. The search is case-insensitive and limited to the specified number of results.
 
         Args:
             conn: The SQLite database connection.
-            like_pat: The pattern to match track titles.
+            phrase: The full-text prefix phrase to match track titles.
             starts_pat: The pattern to match track titles that start with the query.
             limit: The maximum number of results to return.
             artists: A list of artist dictionaries to exclude from the search.
@@ -352,44 +374,73 @@ class MusicCollection:
         Returns:
             List[dict]: A list of dictionaries, each containing artist, album, and track name.
         """
-        skip = {a["artist"].lower() for a in artists}
-        skip.update(a["artist"].lower() for a in albums)
-        if skip:
-            placeholders = ",".join("?" for _ in skip)
-            sql = f"""
-                SELECT artist, album, title AS track, path as file
-                FROM tracks
-                WHERE title LIKE ? COLLATE NOCASE
-                    AND lower(artist) NOT IN ({placeholders})
-                ORDER BY title LIKE ? DESC, title COLLATE NOCASE
-                LIMIT ?
+        skip = {a["artist"] for a in artists}
+        skip.update(a["artist"] for a in albums)
+        cur = conn.execute(
             """
-            cur = conn.execute(sql, (like_pat, starts_pat, *skip, limit))
-        else:
-            cur = conn.execute(
-                """
-                SELECT artist, album, title AS track, path as file
-                FROM tracks
-                WHERE title LIKE ? COLLATE NOCASE
-                ORDER BY title LIKE ? DESC, title COLLATE NOCASE
-                LIMIT ?
-            """,
-                (like_pat, starts_pat, limit),
-            )
+            SELECT t.artist, t.album, t.title AS track, t.path as file
+            FROM tracks_fts
+            JOIN tracks t ON t.rowid = tracks_fts.rowid
+            WHERE tracks_fts MATCH ?
+                AND t.artist COLLATE NOCASE NOT IN (SELECT value FROM json_each(?))
+            ORDER BY t.title LIKE ? DESC, t.title COLLATE NOCASE
+            LIMIT ?
+        """,
+            (f"title : {phrase}", json.dumps(list(skip)), starts_pat, limit),
+        )
         return [
             {"artist": r["artist"], "album": r["album"], "track": r["track"]}
             for r in cur
         ]
 
+    def _search_tracks_substring(
+        self, conn: Connection, query: str, limit: int
+    ) -> list[dict[str, Any]]:
+        """Searches for tracks whose artist, album, or title contains the query.
+
+        Used when the full-text search finds nothing, as the full-text index only matches words by their start. This scans the whole tracks table, so it is only run for queries that match nothing otherwise. Each result records which field contained the query, checking the title first, so callers can tell a track that matched on its artist or album apart from one that matched on its title.
+
+        Args:
+            conn: The SQLite database connection.
+            query: The text to look for anywhere in artist, album, or title.
+            limit: The maximum number of results to return.
+
+        Returns:
+            List[dict]: A list of dictionaries, each containing artist, album, and track name, and the matched field as 'match' ('track', 'artist', or 'album').
+        """
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        cur = conn.execute(
+            """
+            SELECT artist, album, title AS track,
+                CASE
+                    WHEN title LIKE ?1 ESCAPE '\\' THEN 'track'
+                    WHEN artist LIKE ?1 ESCAPE '\\' THEN 'artist'
+                    ELSE 'album'
+                END AS match
+            FROM tracks
+            WHERE artist LIKE ?1 ESCAPE '\\'
+                OR album LIKE ?1 ESCAPE '\\'
+                OR title LIKE ?1 ESCAPE '\\'
+            ORDER BY title COLLATE NOCASE
+            LIMIT ?2
+        """,
+            (f"%{escaped}%", limit),
+        )
+        return [
+            {"artist": r["artist"], "album": r["album"], "track": r["track"], "match": r["match"]}
+            for r in cur
+        ]
+
     # ====================== Maintenance ======================
 
-    def rebuild(self) -> None:
-        """Force full reindex (useful if metadata changed a lot)."""
-        self._extractor.rebuild()
+    def rebuild(self, force: bool = False) -> None:
+        """Reindex changed files, or every file when force is set (useful if metadata changed a lot)."""
+        self._extractor.rebuild(force=force)
 
     def close(self) -> None:
-        """Stop background monitoring. Call explicitly if needed."""
+        """Stop background monitoring and close database connections. Call explicitly if needed."""
         self._extractor.stop_monitoring()
+        self._extractor.close_connections()
 
     def __del__(self):
         # Best effort to stop observer
@@ -1,15 +1,24 @@
-import json
 import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import login_required
-import mutagen
-from werkzeug.utils import secure_filename
+from tinytag import TinyTag, TinyTagException
+
+from .storage import MIXTAPE_DIR, read_mixtape, safe_filename, timestamp, write_mixtape
 
-MIXTAPE_DIR = "mixtapes"
 COVER_DIR = "covers"
 MUSIC_DIR = "/home/mark/Music"
+AUDIO_EXTS = (".mp3", ".flac", ".ogg", ".oga")
+AUDIO_EXT_MAX_LEN = max(map(len, AUDIO_EXTS))
+COVER_EXTS = frozenset({".jpg", ".jpeg", ".png", ".webp"})
+
+# Shared by all requests, so rendering a mixtape does not start new threads
+_TAG_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tag-reader")
+
+# Audio files in MUSIC_DIR: (st_mtime_ns of the directory, filenames)
+_AVAILABLE_TRACKS: tuple[int, tuple[str, ...]] | None = None
 
 editor = Blueprint("editor", __name__)
 
@@ -28,26 +37,22 @@ def edit_mixtape(title):
     Returns:
         Response: Renders the edit page for GET requests, or redirects after processing POST actions.
     """
-    filename = secure_filename(f"{title}.json")
+    filename = safe_filename(f"{title}.json")
     path = os.path.join(MIXTAPE_DIR, filename)
 
     if not os.path.exists(path):
         flash("Mixtape niet gevonden", "danger")
         return redirect(url_for("admin"))
 
-    with open(path, "r") as f:
-        data = json.load(f)
-
-    available_tracks = _get_available_tracks()
-    current_tracks = _get_current_tracks(data)
+    data = read_mixtape(path)
 
     if request.method == "POST":
         return _handle_edit_post_request(title, path, data)
     return render_template(
         "edit.html",
         mixtape=data,
-        current_tracks=current_tracks,
-        available_tracks=available_tracks,
+        current_tracks=_get_current_tracks(data),
+        available_tracks=_get_available_tracks(),
     )
 
 
@@ -65,7 +70,7 @@ def _handle_edit_post_request(title, path, data):
         Response: A redirect or JSON response based on the action performed.
     """
     action = request.form.get("action")
-    if request.content_type.is_json:
+    if request.is_json:
         data_json = request.get_json()
         if data_json.get("action") == "add_tracks":
             return _add_tracks_json(data_json, data, path)
@@ -94,43 +99,49 @@ def _update_title(title, path, data):
         Response: Redirects to the edit page for the new or current title.
     """
     new_title = request.form["title"].strip()
+    new_path = os.path.join(MIXTAPE_DIR, safe_filename(new_title + ".json"))
     if not new_title:
         flash("Titel mag niet leeg zijn", "danger")
-    elif new_title != title and os.path.exists(
-        os.path.join(MIXTAPE_DIR, secure_filename(new_title + ".json"))
-    ):
+    elif new_title != title and os.path.exists(new_path):
         flash("Er bestaat al een mixtape met deze titel", "danger")
     else:
-        new_filename = secure_filename(new_title + ".json")
-        os.rename(path, os.path.join(MIXTAPE_DIR, new_filename))
+        os.rename(path, new_path)
         if data.get("cover"):
             old_cover = data["cover"]
-            new_cover = os.path.join(COVER_DIR, secure_filename(new_title + ".jpg"))
+            new_cover = os.path.join(COVER_DIR, safe_filename(new_title + ".jpg"))
             if os.path.exists(old_cover):
                 os.rename(old_cover, new_cover)
             data["cover"] = new_cover
 
         data["title"] = new_title
-        data["modified"] = datetime.datetime.now().isoformat()
-        with open(os.path.join(MIXTAPE_DIR, new_filename), "w") as f:
-            json.dump(data, f, indent=2)
+        data["modified"] = timestamp()
+        write_mixtape(new_path, data)
         flash("Titel bijgewerkt!", "success")
         return redirect(url_for("edit_mixtape", title=new_title))
     return redirect(url_for("edit_mixtape", title=title))
 
 def _get_available_tracks():
-    """Returns a list of available music tracks in the music directory.
+    """Returns the available music tracks in the music directory.
 
     This function scans the music directory and returns all files with supported audio extensions.
 
+    The listing is cached and only rescanned when the directory's modification time changes, which happens whenever a file is added, removed, or renamed.
+
     Returns:
-        list: A list of filenames for available music tracks.
+        tuple: The filenames of the available music tracks.
     """
-    return [
-        f
-        for f in os.listdir(MUSIC_DIR)
-        if f.lower().endswith((".mp3", ".flac", ".ogg", ".oga"))
-    ]
+    global _AVAILABLE_TRACKS
+    mtime = os.stat(MUSIC_DIR).st_mtime_ns
+    if _AVAILABLE_TRACKS is None or _AVAILABLE_TRACKS[0] != mtime:
+        with os.scandir(MUSIC_DIR) as it:
+            tracks = tuple(
+                e.name
+                for e in it
+                if e.name[-AUDIO_EXT_MAX_LEN:].lower().endswith(AUDIO_EXTS)
+                and e.is_file(follow_symlinks=False)
+            )
+        _AVAILABLE_TRACKS = (mtime, tracks)
+    return _AVAILABLE_TRACKS[1]
 
 
 def _get_current_tracks(data):
@@ -144,26 +155,66 @@ def _get_current_tracks(data):
     Returns:
         list: A list of dictionaries with track path, filename, and tags.
     """
-    current_tracks = []
-    for track_path in data.get("tracks", []):
-        full_path = os.path.join(MUSIC_DIR, track_path.split("/")[-1])
-        try:
-            audio = mutagen.File(full_path)
-            tags = {
-                "title": str(audio.get("TIT2", [os.path.basename(track_path)])[0]),
-                "artist": str(audio.get("TPE1", ["Onbekend"])[0]),
-                "album": str(audio.get("TALB", [""])[0]),
-            }
-        except (mutagen.MutagenError, FileNotFoundError, AttributeError, TypeError):
-            tags = {
-                "title": os.path.basename(track_path),
-                "artist": "Onbekend",
-                "album": "",
-            }
-        current_tracks.append(
-            {"path": track_path, "filename": os.path.basename(track_path), "tags": tags}
-        )
-    return current_tracks
+    track_paths = data.get("tracks", [])
+    # Reading tags mostly waits on the disk, so the files are opened in parallel
+    all_tags = _TAG_POOL.map(_track_tags, track_paths)
+    return [
+        {"path": track_path, "filename": track_path.rpartition("/")[2], "tags": tags}
+        for track_path, tags in zip(track_paths, all_tags)
+    ]
+
+
+def _track_tags(track_path):
+    """Returns the display tags of a mixtape track.
+
+    Falls back to the filename as title and an unknown artist when the file or its tags cannot be read.
+
+    Args:
+        track_path (str): The path of the track as stored in the mixtape.
+
+    Returns:
+        dict: The 'title', 'artist' and 'album' to display.
+    """
+    name = track_path.rpartition("/")[2]
+    try:
+        tag = _read_tags(os.path.join(MUSIC_DIR, name))
+        return {
+            "title": tag["title"] or name,
+            "artist": tag["artist"] or "Onbekend",
+            "album": tag["album"] or "",
+        }
+    except (TinyTagException, OSError):
+        return {
+            "title": name,
+            "artist": "Onbekend",
+            "album": "",
+        }
+
+
+def _read_tags(full_path):
+    """Returns the title, artist and album tags of an audio file.
+
+    Parsed tags are kept in an LRU cache keyed on the file's modification time and size, so an unchanged file is only parsed once.
+
+    Args:
+        full_path (str): The path to the audio file.
+
+    Returns:
+        dict: The 'title', 'artist' and 'album' tags, with None for missing tags.
+
+    Raises:
+        OSError: If the file cannot be accessed.
+        TinyTagException: If the file's tags cannot be parsed.
+    """
+    st = os.stat(full_path)
+    return _parse_tags(full_path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=4096)
+def _parse_tags(full_path, mtime, size):
+    """Parses the tags of an audio file; mtime and size only serve as cache key."""
+    tag = TinyTag.get(full_path, tags=True, duration=False, image=False)
+    return {"title": tag.title, "artist": tag.artist, "album": tag.album}
 
 
 def _handle_edit_post_request(title, path, data):
@@ -180,7 +231,7 @@ def _handle_edit_post_request(title, path, data):
         Response: A redirect or JSON response based on the action performed.
     """
     action = request.form.get("action")
-    if request.content_type.is_json:
+    if request.is_json:
         data_json = request.get_json()
         if data_json.get("action") == "add_tracks":
             return _add_tracks_json(data_json, data, path)
@@ -210,15 +261,16 @@ def _add_tracks_json(data_json, data, path):
     """
     tracks = data_json.get("tracks", [])
     added = 0
+    current = set(data["tracks"])
     for track in tracks:
         full_path = os.path.join(MUSIC_DIR, track.replace("/", os.sep))
-        if os.path.exists(full_path) and full_path not in data["tracks"]:
+        if full_path not in current and os.path.exists(full_path):
             data["tracks"].append(full_path)
+            current.add(full_path)
             added += 1
     if added:
-        data["modified"] = datetime.datetime.now().isoformat()
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        data["modified"] = timestamp()
+        write_mixtape(path, data)
         return jsonify(success=True, added=added)
     return jsonify(success=False)
 
@@ -237,26 +289,23 @@ def _update_title(title, path, data):
         Response: Redirects to the edit page for the new or current title.
     """
     new_title = request.form["title"].strip()
+    new_path = os.path.join(MIXTAPE_DIR, safe_filename(new_title + ".json"))
     if not new_title:
         flash("Titel mag niet leeg zijn", "danger")
-    elif new_title != title and os.path.exists(
-        os.path.join(MIXTAPE_DIR, secure_filename(new_title + ".json"))
-    ):
+    elif new_title != title and os.path.exists(new_path):
         flash("Er bestaat al een mixtape met deze titel", "danger")
     else:
-        new_filename = secure_filename(new_title + ".json")
-        os.rename(path, os.path.join(MIXTAPE_DIR, new_filename))
+        os.rename(path, new_path)
         if data.get("cover"):
             old_cover = data["cover"]
-            new_cover = os.path.join(COVER_DIR, secure_filename(new_title + ".jpg"))
+            new_cover = os.path.join(COVER_DIR, safe_filename(new_title + ".jpg"))
             if os.path.exists(old_cover):
                 os.rename(old_cover, new_cover)
             data["cover"] = new_cover
 
         data["title"] = new_title
-        data["modified"] = datetime.datetime.now().isoformat()
-        with open(os.path.join(MIXTAPE_DIR, new_filename), "w") as f:
-            json.dump(data, f, indent=2)
+        data["modified"] = timestamp()
+        write_mixtape(new_path, data)
         flash("Titel bijgewerkt!", "success")
         return redirect(url_for("edit_mixtape", title=new_title))
     return redirect(url_for("edit_mixtape", title=title))
@@ -276,15 +325,16 @@ def _add_tracks_form(data, path):
     """
     selected = request.form.getlist("new_tracks")
     added = 0
+    current = set(data["tracks"])
     for track in selected:
         track_path = os.path.join(MUSIC_DIR, track)
-        if os.path.exists(track_path) and track_path not in data["tracks"]:
+        if track_path not in current and os.path.exists(track_path):
             data["tracks"].append(track_path)
+            current.add(track_path)
             added += 1
     if added:
-        data["modified"] = datetime.datetime.now().isoformat()
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        data["modified"] = timestamp()
+        write_mixtape(path, data)
         flash(f"{added} track(s) toegevoegd", "success")
     else:
         flash("Geen nieuwe tracks geselecteerd", "info")
@@ -306,9 +356,8 @@ def _remove_track(data, path):
     track_to_remove = request.form["track_path"]
     if track_to_remove in data["tracks"]:
         data["tracks"].remove(track_to_remove)
-        data["modified"] = datetime.datetime.now().isoformat()
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        data["modified"] = timestamp()
+        write_mixtape(path, data)
         flash("Track verwijderd", "success")
     return redirect(url_for("edit_mixtape", title=data["title"]))
 
@@ -328,15 +377,14 @@ def _update_cover(title, data, path):
     """
     file = request.files["cover"]
     ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in [".jpg", ".jpeg", ".png", ".webp"]:
+    if ext not in COVER_EXTS:
         flash("Alleen JPG/PNG/WebP toegestaan", "danger")
     else:
-        cover_path = os.path.join(COVER_DIR, secure_filename(f"{title}.jpg"))
+        cover_path = os.path.join(COVER_DIR, safe_filename(f"{title}.jpg"))
         file.save(cover_path)
         data["cover"] = cover_path
-        data["modified"] = datetime.datetime.now().isoformat()
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        data["modified"] = timestamp()
+        write_mixtape(path, data)
         flash("Cover bijgewerkt!", "success")
     return redirect(url_for("edit_mixtape", title=title))
 
@@ -355,23 +403,23 @@ def add_tracks(title):
     Returns:
         Response: Redirects to the admin page after updating the mixtape.
     """
-    filename = secure_filename(f"{title}.json")
+    filename = safe_filename(f"{title}.json")
     path = os.path.join(MIXTAPE_DIR, filename)
-    with open(path, "r") as f:
-        data = json.load(f)
+    data = read_mixtape(path)
 
     selected_tracks = request.form.getlist("tracks")  # Meerdere selecties
+    current = set(data["tracks"])
     for track in selected_tracks:
         # Prevent directory traversal, but allow subdirectories
         track_path = os.path.normpath(os.path.join(MUSIC_DIR, track))
         if not track_path.startswith(os.path.abspath(MUSIC_DIR)):
             continue
-        if os.path.exists(track_path) and track_path not in data["tracks"]:
+        if track_path not in current and os.path.exists(track_path):
             data["tracks"].append(track_path)
+            current.add(track_path)
 
-    data["modified"] = datetime.datetime.now().isoformat()
-    with open(path, "w") as f:
-        json.dump(data, f)
+    data["modified"] = timestamp()
+    write_mixtape(path, data)
     return redirect(url_for("admin"))
 
 @editor.route("/upload_cover/<title>", methods=["POST"])
@@ -393,16 +441,14 @@ def upload_cover(title):
     if file.filename == "":
         return "Geen file geselecteerd", 400
 
-    filename = secure_filename(f"{title}.jpg")  # Bijv. JPG
+    filename = safe_filename(f"{title}.jpg")  # Bijv. JPG
     path = os.path.join(COVER_DIR, filename)
     file.save(path)
 
-    json_filename = secure_filename(f"{title}.json")
+    json_filename = safe_filename(f"{title}.json")
     json_path = os.path.join(MIXTAPE_DIR, json_filename)
-    with open(json_path, "r") as f:
-        data = json.load(f)
+    data = read_mixtape(json_path)
     data["cover"] = path
-    data["modified"] = datetime.datetime.now().isoformat()
-    with open(json_path, "w") as f:
-        json.dump(data, f)
+    data["modified"] = timestamp()
+    write_mixtape(json_path, data)
     return redirect(url_for("admin"))
\ No newline at end of file
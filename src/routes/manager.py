@@ -1,12 +1,17 @@
-import json
 import os
-from datetime import datetime
 
 from flask import Blueprint, redirect, render_template, request, url_for
 from flask_login import login_required
-from werkzeug.utils import secure_filename
 
-MIXTAPE_DIR = "mixtapes"
+from .storage import (
+    MIXTAPE_DIR,
+    load_mixtapes,
+    read_mixtape,
+    remove_mixtape,
+    safe_filename,
+    timestamp,
+    write_mixtape,
+)
 
 manager = Blueprint("manager", __name__)
 
@@ -26,33 +31,6 @@ def admin():
     return render_template("admin.html", mixtapes=mixtapes, sort_by=sort_by)
 
 
-def load_mixtapes(sort_by="alpha"):
-    """Loads all mixtapes from disk and sorts them by the specified criterion.
-
-    This function reads all mixtape JSON files from the mixtape directory and returns a sorted list of mixtape metadata.
-
-    Args:
-        sort_by (str, optional): The sorting criterion ('alpha', 'created', or 'modified'). Defaults to "alpha".
-
-    Returns:
-        list: A list of dictionaries containing mixtape metadata.
-    """
-    mixtapes = []
-    for filename in os.listdir(MIXTAPE_DIR):
-        if filename.endswith(".json"):
-            with open(os.path.join(MIXTAPE_DIR, filename), "r") as f:
-                data = json.load(f)
-                data["filename"] = filename
-                mixtapes.append(data)
-    if sort_by == "alpha":
-        mixtapes.sort(key=lambda x: x["title"].lower())
-    elif sort_by == "created":
-        mixtapes.sort(key=lambda x: x["created"], reverse=True)
-    elif sort_by == "modified":
-        mixtapes.sort(key=lambda x: x.get("modified", x["created"]), reverse=True)
-    return mixtapes
-
-
 @manager.route("/create_mixtape", methods=["POST"])
 @login_required
 def create_mixtape():
@@ -66,19 +44,19 @@ def create_mixtape():
     title = request.form["title"]
     if not title:
         return "Titel vereist", 400
-    filename = secure_filename(f"{title}.json")
+    filename = safe_filename(f"{title}.json")
     if os.path.exists(os.path.join(MIXTAPE_DIR, filename)):
         return "Titel bestaat al", 400
 
+    now = timestamp()
     data = {
         "title": title,
-        "created": datetime.datetime.now().isoformat(),
-        "modified": datetime.datetime.now().isoformat(),
+        "created": now,
+        "modified": now,
         "tracks": [],  # Lijst van file paths
         "cover": None,  # Path naar cover art
     }
-    with open(os.path.join(MIXTAPE_DIR, filename), "w") as f:
-        json.dump(data, f)
+    write_mixtape(os.path.join(MIXTAPE_DIR, filename), data)
     return redirect(url_for("admin"))
 
 
@@ -95,22 +73,19 @@ def clone_mixtape(title):
     Returns:
         Response: Redirects to the admin page after cloning, or returns an error if the original mixtape is not found.
     """
-    old_filename = secure_filename(f"{title}.json")
+    old_filename = safe_filename(f"{title}.json")
     old_path = os.path.join(MIXTAPE_DIR, old_filename)
     if not os.path.exists(old_path):
         return "Niet gevonden", 404
 
-    with open(old_path, "r") as f:
-        data = json.load(f)
+    data = read_mixtape(old_path)
 
     new_title = f"{title}_clone"
-    new_filename = secure_filename(f"{new_title}.json")
+    new_filename = safe_filename(f"{new_title}.json")
     data["title"] = new_title
-    data["created"] = datetime.datetime.now().isoformat()
-    data["modified"] = datetime.datetime.now().isoformat()
+    data["created"] = data["modified"] = timestamp()
 
-    with open(os.path.join(MIXTAPE_DIR, new_filename), "w") as f:
-        json.dump(data, f)
+    write_mixtape(os.path.join(MIXTAPE_DIR, new_filename), data)
     return redirect(url_for("admin"))
 
 
@@ -127,8 +102,7 @@ def delete_mixtape(title):
     Returns:
         Response: Redirects to the admin page after deletion.
     """
-    filename = secure_filename(f"{title}.json")
+    filename = safe_filename(f"{title}.json")
     path = os.path.join(MIXTAPE_DIR, filename)
-    if os.path.exists(path):
-        os.remove(path)
+    remove_mixtape(path)
     return redirect(url_for("admin"))
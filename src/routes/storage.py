@@ -0,0 +1,157 @@
+import os
+import tempfile
+from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+
+import orjson
+from werkzeug.utils import secure_filename
+
+MIXTAPE_DIR = "mixtapes"
+
+# The process umask, for giving atomically written files the usual permissions. It can only be
+# read by setting it, so that happens once at import, before any request threads run.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Parsed mixtapes by filename, with their sort keys:
+# (st_mtime_ns, data, lowercased title, created, modified or created)
+_MIXTAPE_CACHE: dict[str, tuple[int, dict, str, str, str]] = {}
+
+
+def load_mixtapes(sort_by="alpha"):
+    """Loads all mixtapes from disk and sorts them by the specified criterion.
+
+    This function reads all mixtape JSON files from the mixtape directory and returns a sorted list of mixtape metadata.
+    Parsed files are cached by modification time, so only new or changed files are read from disk again.
+
+    Args:
+        sort_by (str, optional): The sorting criterion ('alpha', 'created', or 'modified'). Defaults to "alpha".
+
+    Returns:
+        list: A list of dictionaries containing mixtape metadata.
+    """
+    entries = []
+    seen = set()
+    with os.scandir(MIXTAPE_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith(".json"):
+                continue
+            mtime = entry.stat().st_mtime_ns
+            cached = _MIXTAPE_CACHE.get(entry.name)
+            if cached is None or cached[0] != mtime:
+                data = read_mixtape(entry.path)
+                data["filename"] = entry.name
+                # Hand-written or older mixtape files may lack the timestamps
+                created = data.get("created", "")
+                cached = (
+                    mtime,
+                    data,
+                    data["title"].lower(),
+                    created,
+                    data.get("modified", created),
+                )
+                _MIXTAPE_CACHE[entry.name] = cached
+            seen.add(entry.name)
+            entries.append(cached)
+
+    # Forget mixtapes that were removed from disk
+    # Another request may remove the same entry concurrently, so pop rather than del
+    for filename in _MIXTAPE_CACHE.keys() - seen:
+        _MIXTAPE_CACHE.pop(filename, None)
+
+    if sort_by == "alpha":
+        entries.sort(key=itemgetter(2))
+    elif sort_by == "created":
+        entries.sort(key=itemgetter(3), reverse=True)
+    elif sort_by == "modified":
+        entries.sort(key=itemgetter(4), reverse=True)
+    return [entry[1] for entry in entries]
+
+
+@lru_cache(maxsize=1024)
+def safe_filename(filename):
+    """Returns a secure version of a filename, caching the result.
+
+    Every request on a mixtape sanitises its title again with secure_filename, so results for recently used titles are reused.
+
+    Args:
+        filename (str): The filename to sanitise.
+
+    Returns:
+        str: The sanitised filename.
+    """
+    return secure_filename(filename)
+
+
+def timestamp():
+    """Returns the current local time as an ISO 8601 string with second precision.
+
+    Returns:
+        str: The timestamp used for the 'created' and 'modified' fields of a mixtape.
+    """
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def read_mixtape(path):
+    """Reads and parses a mixtape JSON file.
+
+    Args:
+        path (str): The path to the mixtape JSON file.
+
+    Returns:
+        dict: The mixtape data.
+    """
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def write_mixtape(path, data):
+    """Writes mixtape data to its JSON file.
+
+    The data is serialized compactly with orjson and written in one call. The cached copy of the mixtape is dropped, so the next listing reads the new version.
+
+    Args:
+        path (str): The path to the mixtape JSON file.
+        data (dict): The mixtape data to write.
+    """
+    _atomic_write(path, orjson.dumps(data))
+    _MIXTAPE_CACHE.pop(os.path.basename(path), None)
+
+
+def remove_mixtape(path):
+    """Deletes a mixtape JSON file if it exists and drops its cached copy.
+
+    Args:
+        path (str): The path to the mixtape JSON file.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    _MIXTAPE_CACHE.pop(os.path.basename(path), None)
+
+
+def _atomic_write(path, payload):
+    """Replaces the contents of a file atomically.
+
+    The payload is written to a temporary file next to the target and moved over it once it is on disk, so an interrupted write never leaves a truncated mixtape behind.
+
+    Args:
+        path (str): The path of the file to write.
+        payload (bytes): The bytes to store.
+    """
+    # A unique temporary file per write, so concurrent saves of one mixtape cannot clobber each other
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # mkstemp creates the file owner-only; give it the permissions a plain open() would
+            os.fchmod(f.fileno(), 0o666 & ~_UMASK)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
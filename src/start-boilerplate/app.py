@@ -1,12 +1,13 @@
 import datetime
 import hashlib
-import json
-import mimetypes
 import os
+import tempfile
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
 
 import mutagen
+import orjson
 from flask import (
     Flask,
     Response,
@@ -15,6 +16,7 @@ from flask import (
     redirect,
     render_template,
     request,
+    send_file,
     send_from_directory,
     url_for,
 )
@@ -27,9 +29,13 @@ from flask_login import (
     logout_user,
 )
 from PIL import Image
+from tinytag import TinyTag, TinyTagException
 from werkzeug.utils import secure_filename
 
+from jsonprovider import OrjsonProvider
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = "your_secret_key"  # Verander dit in productie!
 
 # Login setup
@@ -57,6 +63,21 @@ MIXTAPE_DIR = "mixtapes"
 MUSIC_DIR = "/home/mark/Music"
 COVER_DIR = "covers"
 THUMBNAIL_CACHE = "thumbnail_cache"
+AUDIO_EXTS = (".mp3", ".flac", ".ogg", ".oga")
+MIME_BY_EXT = {
+    "mp3": "audio/mpeg",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+    "oga": "audio/ogg",
+    "m4a": "audio/mp4",
+    "wav": "audio/wav",
+}
+COVER_EXTS = frozenset({".jpg", ".jpeg", ".png", ".webp"})
+
+# The process umask, for giving atomically written files the usual permissions. It can only be
+# read by setting it, so that happens once at import, before any request threads run.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 os.makedirs(MIXTAPE_DIR, exist_ok=True)
 os.makedirs(MUSIC_DIR, exist_ok=True)
@@ -79,10 +100,9 @@ def load_mixtapes(sort_by="alpha"):
     mixtapes = []
     for filename in os.listdir(MIXTAPE_DIR):
         if filename.endswith(".json"):
-            with open(os.path.join(MIXTAPE_DIR, filename), "r") as f:
-                data = json.load(f)
-                data["filename"] = filename
-                mixtapes.append(data)
+            data = _read_mixtape(os.path.join(MIXTAPE_DIR, filename))
+            data["filename"] = filename
+            mixtapes.append(data)
     if sort_by == "alpha":
         mixtapes.sort(key=lambda x: x["title"].lower())
     elif sort_by == "created":
@@ -92,6 +112,58 @@ def load_mixtapes(sort_by="alpha"):
     return mixtapes
 
 
+def _read_mixtape(path):
+    """Reads and parses a mixtape JSON file.
+
+    Args:
+        path (str): The path to the mixtape JSON file.
+
+    Returns:
+        dict: The mixtape data.
+    """
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def _write_mixtape(path, data):
+    """Writes mixtape data to its JSON file.
+
+    The data is serialized compactly with orjson and written in one call, atomically.
+
+    Args:
+        path (str): The path to the mixtape JSON file.
+        data (dict): The mixtape data to write.
+    """
+    _atomic_write(path, orjson.dumps(data))
+
+
+def _atomic_write(path, payload):
+    """Replaces the contents of a file atomically.
+
+    The payload is written to a temporary file next to the target and moved over it once it is on disk, so an interrupted write never leaves a truncated mixtape behind.
+
+    Args:
+        path (str): The path of the file to write.
+        payload (bytes): The bytes to store.
+    """
+    # A unique temporary file per write, so concurrent saves of one mixtape cannot clobber each other
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # mkstemp creates the file owner-only; give it the permissions a plain open() would
+            os.fchmod(f.fileno(), 0o666 & ~_UMASK)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
 def get_album_art(album_path: Path):
     """Retrieves album art for a given album directory.
 
@@ -222,8 +294,7 @@ def create_mixtape():
         "tracks": [],  # Lijst van file paths
         "cover": None,  # Path naar cover art
     }
-    with open(os.path.join(MIXTAPE_DIR, filename), "w") as f:
-        json.dump(data, f)
+    _write_mixtape(os.path.join(MIXTAPE_DIR, filename), data)
     return redirect(url_for("admin"))
 
 
@@ -246,8 +317,7 @@ def clone_mixtape(title):
     if not os.path.exists(old_path):
         return "Niet gevonden", 404
 
-    with open(old_path, "r") as f:
-        data = json.load(f)
+    data = _read_mixtape(old_path)
 
     new_title = f"{title}_clone"
     new_filename = secure_filename(f"{new_title}.json")
@@ -255,8 +325,7 @@ def clone_mixtape(title):
     data["created"] = datetime.datetime.now().isoformat()
     data["modified"] = datetime.datetime.now().isoformat()
 
-    with open(os.path.join(MIXTAPE_DIR, new_filename), "w") as f:
-        json.dump(data, f)
+    _write_mixtape(os.path.join(MIXTAPE_DIR, new_filename), data)
     return redirect(url_for("admin"))
 
 
@@ -302,8 +371,7 @@ def edit_mixtape(title):
         flash("Mixtape niet gevonden", "danger")
         return redirect(url_for("admin"))
 
-    with open(path, "r") as f:
-        data = json.load(f)
+    data = _read_mixtape(path)
 
     available_tracks = _get_available_tracks()
     current_tracks = _get_current_tracks(data)
@@ -326,11 +394,12 @@ def _get_available_tracks():
     Returns:
         list: A list of filenames for available music tracks.
     """
-    return [
-        f
-        for f in os.listdir(MUSIC_DIR)
-        if f.lower().endswith((".mp3", ".flac", ".ogg", ".oga"))
-    ]
+    with os.scandir(MUSIC_DIR) as it:
+        return [
+            e.name
+            for e in it
+            if e.is_file(follow_symlinks=False) and e.name.lower().endswith(AUDIO_EXTS)
+        ]
 
 
 def _get_current_tracks(data):
@@ -348,13 +417,13 @@ def _get_current_tracks(data):
     for track_path in data.get("tracks", []):
         full_path = os.path.join(MUSIC_DIR, track_path.split("/")[-1])
         try:
-            audio = mutagen.File(full_path)
+            tag = _read_tags(full_path)
             tags = {
-                "title": str(audio.get("TIT2", [os.path.basename(track_path)])[0]),
-                "artist": str(audio.get("TPE1", ["Onbekend"])[0]),
-                "album": str(audio.get("TALB", [""])[0]),
+                "title": tag["title"] or os.path.basename(track_path),
+                "artist": tag["artist"] or "Onbekend",
+                "album": tag["album"] or "",
             }
-        except (mutagen.MutagenError, FileNotFoundError, AttributeError, TypeError):
+        except (TinyTagException, OSError):
             tags = {
                 "title": os.path.basename(track_path),
                 "artist": "Onbekend",
@@ -366,6 +435,32 @@ def _get_current_tracks(data):
     return current_tracks
 
 
+def _read_tags(full_path):
+    """Returns the title, artist and album tags of an audio file.
+
+    Parsed tags are kept in an LRU cache keyed on the file's modification time and size, so an unchanged file is only parsed once.
+
+    Args:
+        full_path (str): The path to the audio file.
+
+    Returns:
+        dict: The 'title', 'artist' and 'album' tags, with None for missing tags.
+
+    Raises:
+        OSError: If the file cannot be accessed.
+        TinyTagException: If the file's tags cannot be parsed.
+    """
+    st = os.stat(full_path)
+    return _parse_tags(full_path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=4096)
+def _parse_tags(full_path, mtime, size):
+    """Parses the tags of an audio file; mtime and size only serve as cache key."""
+    tag = TinyTag.get(full_path, tags=True, duration=False, image=False)
+    return {"title": tag.title, "artist": tag.artist, "album": tag.album}
+
+
 def _handle_edit_post_request(title, path, data):
     """Handles POST requests for editing a mixtape.
 
@@ -380,7 +475,7 @@ def _handle_edit_post_request(title, path, data):
         Response: A redirect or JSON response based on the action performed.
     """
     action = request.form.get("action")
-    if request.content_type.is_json:
+    if request.is_json:
         data_json = request.get_json()
         if data_json.get("action") == "add_tracks":
             return _add_tracks_json(data_json, data, path)
@@ -410,15 +505,16 @@ def _add_tracks_json(data_json, data, path):
     """
     tracks = data_json.get("tracks", [])
     added = 0
+    current = set(data["tracks"])
     for track in tracks:
         full_path = os.path.join(MUSIC_DIR, track.replace("/", os.sep))
-        if os.path.exists(full_path) and full_path not in data["tracks"]:
+        if full_path not in current and os.path.exists(full_path):
             data["tracks"].append(full_path)
+            current.add(full_path)
             added += 1
     if added:
         data["modified"] = datetime.datetime.now().isoformat()
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        _write_mixtape(path, data)
         return jsonify(success=True, added=added)
     return jsonify(success=False)
 
@@ -455,8 +551,7 @@ def _update_title(title, path, data):
 
         data["title"] = new_title
         data["modified"] = datetime.datetime.now().isoformat()
-        with open(os.path.join(MIXTAPE_DIR, new_filename), "w") as f:
-            json.dump(data, f, indent=2)
+        _write_mixtape(os.path.join(MIXTAPE_DIR, new_filename), data)
         flash("Titel bijgewerkt!", "success")
         return redirect(url_for("edit_mixtape", title=new_title))
     return redirect(url_for("edit_mixtape", title=title))
@@ -476,15 +571,16 @@ def _add_tracks_form(data, path):
     """
     selected = request.form.getlist("new_tracks")
     added = 0
+    current = set(data["tracks"])
     for track in selected:
         track_path = os.path.join(MUSIC_DIR, track)
-        if os.path.exists(track_path) and track_path not in data["tracks"]:
+        if track_path not in current and os.path.exists(track_path):
             data["tracks"].append(track_path)
+            current.add(track_path)
             added += 1
     if added:
         data["modified"] = datetime.datetime.now().isoformat()
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        _write_mixtape(path, data)
         flash(f"{added} track(s) toegevoegd", "success")
     else:
         flash("Geen nieuwe tracks geselecteerd", "info")
@@ -507,8 +603,7 @@ def _remove_track(data, path):
     if track_to_remove in data["tracks"]:
         data["tracks"].remove(track_to_remove)
         data["modified"] = datetime.datetime.now().isoformat()
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        _write_mixtape(path, data)
         flash("Track verwijderd", "success")
     return redirect(url_for("edit_mixtape", title=data["title"]))
 
@@ -528,15 +623,14 @@ def _update_cover(title, data, path):
     """
     file = request.files["cover"]
     ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in [".jpg", ".jpeg", ".png", ".webp"]:
+    if ext not in COVER_EXTS:
         flash("Alleen JPG/PNG/WebP toegestaan", "danger")
     else:
         cover_path = os.path.join(COVER_DIR, secure_filename(f"{title}.jpg"))
         file.save(cover_path)
         data["cover"] = cover_path
         data["modified"] = datetime.datetime.now().isoformat()
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        _write_mixtape(path, data)
         flash("Cover bijgewerkt!", "success")
     return redirect(url_for("edit_mixtape", title=title))
 
@@ -557,21 +651,21 @@ def add_tracks(title):
     """
     filename = secure_filename(f"{title}.json")
     path = os.path.join(MIXTAPE_DIR, filename)
-    with open(path, "r") as f:
-        data = json.load(f)
+    data = _read_mixtape(path)
 
     selected_tracks = request.form.getlist("tracks")  # Meerdere selecties
+    current = set(data["tracks"])
     for track in selected_tracks:
         # Prevent directory traversal, but allow subdirectories
         track_path = os.path.normpath(os.path.join(MUSIC_DIR, track))
         if not track_path.startswith(os.path.abspath(MUSIC_DIR)):
             continue
-        if os.path.exists(track_path) and track_path not in data["tracks"]:
+        if track_path not in current and os.path.exists(track_path):
             data["tracks"].append(track_path)
+            current.add(track_path)
 
     data["modified"] = datetime.datetime.now().isoformat()
-    with open(path, "w") as f:
-        json.dump(data, f)
+    _write_mixtape(path, data)
     return redirect(url_for("admin"))
 
 
@@ -679,8 +773,6 @@ def reorder_tracks(title):
     Returns:
         Response: A JSON response indicating success or failure.
     """
-    import json
-
     data = request.get_json()
     new_order = data.get("tracks", [])
 
@@ -690,16 +782,14 @@ def reorder_tracks(title):
     if not os.path.exists(path):
         return jsonify(success=False), 404
 
-    with open(path, "r") as f:
-        mixtape = json.load(f)
+    mixtape = _read_mixtape(path)
 
-    # Behoud alleen tracks die nog bestaan
-    valid_paths = [p for p in new_order if os.path.exists(p)]
+    # Behoud alleen tracks die nog bestaan, elk pad één keer
+    valid_paths = [p for p in dict.fromkeys(new_order) if os.path.exists(p)]
     mixtape["tracks"] = valid_paths
     mixtape["modified"] = datetime.datetime.now().isoformat()
 
-    with open(path, "w") as f:
-        json.dump(mixtape, f, indent=2)
+    _write_mixtape(path, mixtape)
 
     return jsonify(success=True)
 
@@ -730,12 +820,10 @@ def upload_cover(title):
 
     json_filename = secure_filename(f"{title}.json")
     json_path = os.path.join(MIXTAPE_DIR, json_filename)
-    with open(json_path, "r") as f:
-        data = json.load(f)
+    data = _read_mixtape(json_path)
     data["cover"] = path
     data["modified"] = datetime.datetime.now().isoformat()
-    with open(json_path, "w") as f:
-        json.dump(data, f)
+    _write_mixtape(json_path, data)
     return redirect(url_for("admin"))
 
 
@@ -757,20 +845,19 @@ def mixtape(title):
     if not os.path.exists(path):
         return "Niet gevonden", 404
 
-    with open(path, "r") as f:
-        data = json.load(f)
+    data = _read_mixtape(path)
 
     # Haal tags op voor playlist weergave
     playlist = []
     for track_path in data["tracks"]:
         try:
-            audio = mutagen.File(track_path)
+            tag = _read_tags(track_path)
             tags = {
-                "title": audio.get("TIT2", ["Unknown"])[0],
-                "artist": audio.get("TPE1", ["Unknown"])[0],
-                "album": audio.get("TALB", ["Unknown"])[0],
+                "title": tag["title"] or "Unknown",
+                "artist": tag["artist"] or "Unknown",
+                "album": tag["album"] or "Unknown",
             }
-        except:
+        except (TinyTagException, OSError):
             tags = {
                 "title": os.path.basename(track_path),
                 "artist": "Unknown",
@@ -789,44 +876,24 @@ def mixtape(title):
 def stream(track_path):
     """Streams an audio track from the music directory to the client.
 
-    This endpoint serves audio files in chunks, setting the appropriate MIME type for playback in browsers or media players.
+    This endpoint serves audio files with the appropriate MIME type for playback in browsers or media players.
+    Range and conditional requests are supported, so players can seek without downloading the whole file.
 
     Args:
         track_path (str): The relative path to the audio track within the music directory.
 
     Returns:
-        Response: A streaming response with the audio file, or a 404 error if the file is not found.
+        Response: A response with the audio file, or a 404 error if the file is not found.
     """
-    full_path = os.path.join(MUSIC_DIR, track_path)
-    if not os.path.exists(full_path):
+    music_root = os.path.realpath(MUSIC_DIR)
+    full_path = os.path.realpath(os.path.join(music_root, track_path))
+    if not full_path.startswith(music_root + os.sep) or not os.path.isfile(full_path):
         return "Niet gevonden", 404
 
-    def generate():
-        with open(full_path, "rb") as f:
-            while chunk := f.read(4096):
-                yield chunk
-
-    mimetypes.add_type("audio/mp4", ".m4a")
-    mimetypes.add_type("audio/ogg", ".oga")
-    mimetypes.add_type("audio/flac", ".flac")
-
-    mimetype, _ = mimetypes.guess_type(track_path)
-    if mimetype is None:
-        # Fallback for unknown types
-        ext = os.path.splitext(track_path)[1].lower()
-        if ext == ".mp3":
-            mimetype = "audio/mpeg"
-        elif ext == ".flac":
-            mimetype = "audio/flac"
-        elif ext == ".ogg":
-            mimetype = "audio/ogg"
-        elif ext == ".m4a":
-            mimetype = "audio/mp4"
-        elif ext == ".oga":
-            mimetype = "audio/ogg"
-        else:
-            mimetype = "application/octet-stream"
-    return Response(generate(), mimetype=mimetype)
+    mimetype = MIME_BY_EXT.get(
+        track_path.rpartition(".")[2].lower(), "application/octet-stream"
+    )
+    return send_file(full_path, mimetype=mimetype, conditional=True)
 
 
 # Lijst van beschikbare tracks voor admin (om toe te voegen)
@@ -840,11 +907,12 @@ def available_tracks():
     Returns:
         Response: A JSON response containing the list of available tracks.
     """
-    tracks = [
-        f
-        for f in os.listdir(MUSIC_DIR)
-        if f.lower().endswith((".mp3", ".flac", ".ogg"))
-    ]
+    with os.scandir(MUSIC_DIR) as it:
+        tracks = [
+            e.name
+            for e in it
+            if e.is_file(follow_symlinks=False) and e.name.lower().endswith(AUDIO_EXTS)
+        ]
     return jsonify(tracks)
 
 